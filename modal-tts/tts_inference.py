@@ -1,7 +1,8 @@
+import os
 from pathlib import Path
+from typing import Optional
 import modal
-from pydantic import BaseModel
-import asyncio
+from pydantic import BaseModel, Field
 
 volume = modal.Volume.from_name("xtts-model")
 
@@ -24,6 +25,10 @@ image = image.add_local_dir("build", remote_path="/root/build", copy=True)
 image = image.run_commands(
     "python /root/build/download_camel.py"
 )
+# Shared with the RunPod service in tts/
+image = image.add_local_file("../tts/core/executor.py", "/root/executor.py")
+image = image.add_local_file("../tts/utils/profiling.py", "/root/profiling.py")
+image = image.add_local_file("../tts/core/memory.py", "/root/memory.py")
 
 
 app = modal.App("tts-inference")
@@ -32,6 +37,30 @@ class SynthesizeRequest(BaseModel):
     text: str
     language: str = "en"
 
+class ProfileRequest(BaseModel):
+    requests: int = Field(10, ge=1, le=1000)
+    torch_trace: bool = True
+
+# Long-lived inference threads, each with its own CUDA stream
+TTS_INFERENCE_THREADS = 4
+TASHKEEL_INFERENCE_THREADS = 2
+
+# On-demand profiling artifacts (see /admin/profile)
+PROFILE_DIR = "/root/profiles"
+# Containers don't see the deployer's environment, the token comes from
+# the "tts-admin" secret attached below
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# GPU memory budgeting (see memory.py). Activation budgets are floors that
+# warm-up calibration raises to the measured peak.
+GPU_MEMORY_SAFETY = 0.1
+XTTS_ACTIVATION_MB = 1024
+TASHKEEL_ACTIVATION_MB = 128
+TASHKEEL_WEIGHTS_MB = 450
+
+TTS_WARMUP_TEXT = "This is a warm-up sentence to load the TTS model."
+TASHKEEL_WARMUP_TEXT = "مرحبا بك"
+
 # Default speakers
 DEFAULT_SPEAKERS = {
     "en": "Andrew Chipper",
@@ -43,13 +72,14 @@ with image.imports():
     import base64
     import tempfile
 
-    import os
-    os.environ["CUDA_LAUNCH_BLOCKING"] = "1"
-
     from TTS.api import TTS
     from camel_tools.disambig.bert import BERTUnfactoredDisambiguator
     from camel_tools.tagger.default import DefaultTagger
     from camel_tools.tokenizers.word import simple_word_tokenize
+
+    from executor import InferenceExecutor
+    import profiling
+    from memory import MemoryManager
     
 
 @app.cls(
@@ -59,28 +89,61 @@ with image.imports():
     max_containers=3,
     scaledown_window=300,
     volumes={"/model": volume},
+    secrets=[modal.Secret.from_name("tts-admin", required_keys=["ADMIN_TOKEN"])],
 )
 @modal.concurrent(max_inputs=5)
 class CoaquiTTS:
     @modal.enter()
     def load(self):
+        self.memory = MemoryManager("cuda", GPU_MEMORY_SAFETY)
+
         print("Loading XTTS v2...")
 
-        self.tts_model = TTS(
-            model_path="/model/xtts_v2",
-            config_path="/model/xtts_v2/config.json",
-            progress_bar=False,
-            gpu=True
-        ).to("cuda")
+        with self.memory.measure("xtts"):
+            self.tts_model = TTS(
+                model_path="/model/xtts_v2",
+                config_path="/model/xtts_v2/config.json",
+                progress_bar=False,
+                gpu=True
+            ).to("cuda")
+
+        # Separates GPT decode from the HiFi-GAN vocoder on profiled requests
+        profiling.time_module(self.tts_model.synthesizer.tts_model.hifigan_decoder, "vocoder")
+        self.profiler = profiling.Profiler(PROFILE_DIR)
+
+        # Warm-up doubles as calibration of the per-request activation budget
+        self.memory.calibrate("xtts", lambda: self.tts_model.tts(
+            text=TTS_WARMUP_TEXT,
+            speaker=DEFAULT_SPEAKERS["en"],
+            language="en",
+        ), XTTS_ACTIVATION_MB)
 
         print("Loading Tashkeel model...")
 
-        self.disambiguator = BERTUnfactoredDisambiguator.pretrained(
-            model_name='msa',
-            use_gpu=True
+        # Keep BERT on the GPU only if XTTS still has room for its inference
+        # threads afterwards; otherwise it runs on CPU
+        use_gpu = self.memory.fits_on_gpu(
+            TASHKEEL_WEIGHTS_MB
+            + TASHKEEL_ACTIVATION_MB
+            + self.memory.budgets["xtts"] * TTS_INFERENCE_THREADS
         )
+
+        with self.memory.measure("tashkeel", on_gpu=use_gpu):
+            self.disambiguator = BERTUnfactoredDisambiguator.pretrained(
+                model_name='msa',
+                use_gpu=use_gpu
+            )
         self.tagger = DefaultTagger(self.disambiguator, 'diac')
 
+        self.memory.calibrate(
+            "tashkeel",
+            lambda: self.tagger.tag(simple_word_tokenize(TASHKEEL_WARMUP_TEXT)),
+            TASHKEEL_ACTIVATION_MB
+        )
+
+        self.tts_executor = InferenceExecutor(TTS_INFERENCE_THREADS, name="xtts", device="cuda")
+        self.tashkeel_executor = InferenceExecutor(TASHKEEL_INFERENCE_THREADS, name="tashkeel", device="cuda")
+
         print("✅ Tashkeel model loaded.")
 
     
@@ -91,16 +154,19 @@ class CoaquiTTS:
         return output
 
     async def diacritize(self, text: str):
-        tokens = simple_word_tokenize(text)
-
-        start = time.time()
-        diacritized_tokens = await asyncio.to_thread(
-            self.tagger.tag,
-            tokens,
-        )
+        with profiling.stage("tokenize"):
+            tokens = simple_word_tokenize(text)
+
+        async with self.memory.reserve("tashkeel"):
+            start = time.time()
+            diacritized_tokens = await self.tashkeel_executor.run(
+                profiling.traced(self.tagger.tag, "tashkeel"),
+                tokens,
+            )
 
         result = " ".join(diacritized_tokens)
         latency = (time.time() - start) * 1000
+        profiling.record("tashkeel", latency)
 
         return result, latency
 
@@ -113,19 +179,23 @@ class CoaquiTTS:
             with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
                 out_path = f.name
 
-            # Run blocking TTS in thread pool
-            await asyncio.to_thread(
-                self.tts_model.tts_to_file,
-                file_path=out_path,
-                text=text,
-                speaker=speaker,
-                language=language,
-            )
+            # Run blocking TTS on a dedicated inference thread
+            async with self.memory.reserve("xtts"):
+                with profiling.stage("xtts"):
+                    await self.tts_executor.run(
+                        profiling.traced(self.tts_model.tts_to_file, "xtts"),
+                        file_path=out_path,
+                        text=text,
+                        speaker=speaker,
+                        language=language,
+                    )
 
-            with open(out_path, "rb") as f:
-                audio_bytes = f.read()
+            with profiling.stage("wav_read"):
+                with open(out_path, "rb") as f:
+                    audio_bytes = f.read()
 
-            audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
+            with profiling.stage("base64"):
+                audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
 
             latency_ms = (time.time() - start_time) * 1000
 
@@ -144,55 +214,84 @@ class CoaquiTTS:
 
     @modal.asgi_app(requires_proxy_auth=True)
     def web(self):
-        from fastapi import FastAPI, HTTPException
+        from fastapi import FastAPI, Header, HTTPException
+        from fastapi.responses import FileResponse
 
         web_app = FastAPI()
 
         @web_app.get("/ping")
         async def ping():
-            return {"status": "ok", "message": "TTS API is alive!"}
+            return {
+                "status": "ok",
+                "message": "TTS API is alive!",
+                "memory": self.memory.report(),
+            }
         
         @web_app.post("/synthesize")
         async def synthesize(req: SynthesizeRequest):
             if not req.text:
                 raise HTTPException(status_code=400, detail="text is required")
 
-            total_start = time.time()
-
-            text = req.text
-            tashkeel_latency = 0
-
-            # 🔥 Apply tashkeel only for Arabic
-            if req.language == "ar":
-                text, tashkeel_latency = await self.diacritize(text)
-
-            try:
-                audio_result = await self.text_to_speech(
-                    text,
-                    req.language,
-                )
-
-                audio = audio_result["audio"]
-                speaker = audio_result["speaker"]
-                tts_latency = audio_result["latency_ms"]
-
-            except Exception as e:
-                print(f"Error in synthesis: {e}")
-                raise HTTPException(status_code=500, detail=str(e))
+            with self.profiler.request("tts"):
+                total_start = time.time()
+
+                text = req.text
+                tashkeel_latency = 0
+
+                # 🔥 Apply tashkeel only for Arabic
+                if req.language == "ar":
+                    text, tashkeel_latency = await self.diacritize(text)
+
+                try:
+                    audio_result = await self.text_to_speech(
+                        text,
+                        req.language,
+                    )
+
+                    audio = audio_result["audio"]
+                    speaker = audio_result["speaker"]
+                    tts_latency = audio_result["latency_ms"]
+
+                except Exception as e:
+                    print(f"Error in synthesis: {e}")
+                    raise HTTPException(status_code=500, detail=str(e))
+
+                total_latency = (time.time() - total_start) * 1000
+
+                return {
+                    "audio": audio,
+                    "format": "wav",
+                    "language": req.language,
+                    "speaker": speaker,
+                    "text": text,
+                    "latency": {
+                        "tashkeel_ms": round(tashkeel_latency, 2),
+                        "tts_ms": round(tts_latency, 2),
+                        "total_ms": round(total_latency, 2)
+                    }
+                }
 
-            total_latency = (time.time() - total_start) * 1000
+        def check_admin(token):
+            if not ADMIN_TOKEN or token != ADMIN_TOKEN:
+                raise HTTPException(status_code=403, detail="forbidden")
+
+        @web_app.post("/admin/profile")
+        async def start_profiling(req: ProfileRequest, x_admin_token: Optional[str] = Header(None)):
+            check_admin(x_admin_token)
+            self.profiler.arm(req.requests, req.torch_trace)
+            return self.profiler.status()
+
+        @web_app.get("/admin/profile")
+        async def profiling_status(x_admin_token: Optional[str] = Header(None)):
+            check_admin(x_admin_token)
+            return self.profiler.status()
+
+        @web_app.get("/admin/profile/{name}")
+        async def profiling_artifact(name: str, x_admin_token: Optional[str] = Header(None)):
+            check_admin(x_admin_token)
+            path = os.path.join(PROFILE_DIR, os.path.basename(name))
+            if not os.path.isfile(path):
+                raise HTTPException(status_code=404, detail="not found")
+            return FileResponse(path)
 
-            return {
-                "audio": audio,
-                "format": "wav",
-                "language": req.language,
-                "speaker": speaker,
-                "text": text,
-                "latency": {
-                    "tashkeel_ms": round(tashkeel_latency, 2),
-                    "tts_ms": round(tts_latency, 2),
-                    "total_ms": round(total_latency, 2)
-                }
-            }
-        
         return web_app
@@ -1,5 +1,7 @@
+import os
+from typing import Optional
 import modal
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 volume = modal.Volume.from_name("xtts-model")
 
@@ -23,6 +25,10 @@ image = image.add_local_dir("build", remote_path="/root/build", copy=True)
 image = image.run_commands(
     "python /root/build/download_camel.py"
 )
+# Shared with the RunPod service in tts/
+image = image.add_local_file("../tts/core/executor.py", "/root/executor.py")
+image = image.add_local_file("../tts/utils/profiling.py", "/root/profiling.py")
+image = image.add_local_file("../tts/core/memory.py", "/root/memory.py")
 
 app = modal.App("tts-streaming-inference")
 
@@ -30,9 +36,30 @@ class SynthesizeRequest(BaseModel):
     text: str
     language: str = "en"
 
+class ProfileRequest(BaseModel):
+    requests: int = Field(10, ge=1, le=1000)
+    torch_trace: bool = True
+
 TTS_WARMUP_TEXT = "This is a warm-up sentence to load the TTS model."
 TASHKEEL_WARMUP_TEXT = "مرحبا بك"
 
+# Long-lived inference threads, each with its own CUDA stream
+TTS_INFERENCE_THREADS = 2
+TASHKEEL_INFERENCE_THREADS = 2
+
+# On-demand profiling artifacts (see /admin/profile)
+PROFILE_DIR = "/root/profiles"
+# Containers don't see the deployer's environment, the token comes from
+# the "tts-admin" secret attached below
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# GPU memory budgeting (see memory.py). Activation budgets are floors that
+# warm-up calibration raises to the measured peak.
+GPU_MEMORY_SAFETY = 0.1
+XTTS_ACTIVATION_MB = 1024
+TASHKEEL_ACTIVATION_MB = 128
+TASHKEEL_WEIGHTS_MB = 450
+
 DEFAULT_SPEAKERS = {
     "en": "Andrew Chipper",
     "ar": "Badr Odhiambo"
@@ -41,13 +68,13 @@ DEFAULT_SPEAKERS = {
 
 with image.imports():
     import time
-    import asyncio
     import torch
     import io
     import soundfile as sf
     import base64
 
-    from fastapi import FastAPI, HTTPException
+    from fastapi import FastAPI, Header, HTTPException
+    from fastapi.responses import FileResponse
 
     from TTS.tts.configs.xtts_config import XttsConfig
     from TTS.tts.models.xtts import Xtts
@@ -56,6 +83,10 @@ with image.imports():
     from camel_tools.tagger.default import DefaultTagger
     from camel_tools.tokenizers.word import simple_word_tokenize
 
+    from executor import InferenceExecutor
+    import profiling
+    from memory import MemoryManager
+
 
 @app.cls(
     image=image,
@@ -64,19 +95,27 @@ with image.imports():
     max_containers=3,
     scaledown_window=60,
     volumes={"/model": volume},
+    secrets=[modal.Secret.from_name("tts-admin", required_keys=["ADMIN_TOKEN"])],
 )
 @modal.concurrent(max_inputs=3)
 class CoquiTTS:
     @modal.enter()
     async def load(self):
+        self.memory = MemoryManager("cuda", GPU_MEMORY_SAFETY)
+
         print("Loading XTTS v2...")
 
-        config = XttsConfig()
-        config.load_json("/model/xtts_v2/config.json")
-        self.model = Xtts.init_from_config(config)
-        self.model.load_checkpoint(config, checkpoint_dir="/model/xtts_v2")
-        self.model.cuda()
-        self.model.eval()
+        with self.memory.measure("xtts"):
+            config = XttsConfig()
+            config.load_json("/model/xtts_v2/config.json")
+            self.model = Xtts.init_from_config(config)
+            self.model.load_checkpoint(config, checkpoint_dir="/model/xtts_v2")
+            self.model.cuda()
+            self.model.eval()
+
+        # Separates GPT decode from the HiFi-GAN vocoder on profiled requests
+        profiling.time_module(self.model.hifigan_decoder, "vocoder")
+        self.profiler = profiling.Profiler(PROFILE_DIR)
 
         self.speaker_latents = {}
 
@@ -95,6 +134,17 @@ class CoquiTTS:
             }
 
 
+        # Warm-up doubles as calibration of the per-request activation budget
+        print("Warming up TTS model...")
+        latents = self.speaker_latents["en"]
+        self.memory.calibrate("xtts", lambda: self.model.inference(
+            text=TTS_WARMUP_TEXT,
+            language="en",
+            gpt_cond_latent=latents["gpt"],
+            speaker_embedding=latents["speaker"],
+            temperature=0.7,
+        ), XTTS_ACTIVATION_MB)
+
         # self.tts_model = TTS(
         #     model_path="/model/xtts_v2",
         #     config_path="/model/xtts_v2/config.json",
@@ -104,17 +154,30 @@ class CoquiTTS:
 
         print("Loading Tashkeel model...")
 
-        self.disambiguator = BERTUnfactoredDisambiguator.pretrained(
-            model_name='msa',
-            use_gpu=True
+        # Keep BERT on the GPU only if XTTS still has room for its inference
+        # threads afterwards; otherwise it runs on CPU
+        use_gpu = self.memory.fits_on_gpu(
+            TASHKEEL_WEIGHTS_MB
+            + TASHKEEL_ACTIVATION_MB
+            + self.memory.budgets["xtts"] * TTS_INFERENCE_THREADS
         )
+
+        with self.memory.measure("tashkeel", on_gpu=use_gpu):
+            self.disambiguator = BERTUnfactoredDisambiguator.pretrained(
+                model_name='msa',
+                use_gpu=use_gpu
+            )
         self.tagger = DefaultTagger(self.disambiguator, 'diac')
 
-        print("Warming up TTS model...")
-        await self.text_to_speech(TTS_WARMUP_TEXT, language="en")
+        self.tts_executor = InferenceExecutor(TTS_INFERENCE_THREADS, name="xtts", device="cuda")
+        self.tashkeel_executor = InferenceExecutor(TASHKEEL_INFERENCE_THREADS, name="tashkeel", device="cuda")
 
         print("Warming up Tashkeel model...")
-        await self.diacritize(TASHKEEL_WARMUP_TEXT)
+        self.memory.calibrate(
+            "tashkeel",
+            lambda: self.tagger.tag(simple_word_tokenize(TASHKEEL_WARMUP_TEXT)),
+            TASHKEEL_ACTIVATION_MB
+        )
 
         print("✅ Models warmed up and ready for inference.")    
 
@@ -126,16 +189,19 @@ class CoquiTTS:
         return output
 
     async def diacritize(self, text: str):
-        tokens = simple_word_tokenize(text)
+        with profiling.stage("tokenize"):
+            tokens = simple_word_tokenize(text)
 
-        start = time.time()
-        diacritized_tokens = await asyncio.to_thread(
-            self.tagger.tag,
-            tokens,
-        )
+        async with self.memory.reserve("tashkeel"):
+            start = time.time()
+            diacritized_tokens = await self.tashkeel_executor.run(
+                profiling.traced(self.tagger.tag, "tashkeel"),
+                tokens,
+            )
 
         result = " ".join(diacritized_tokens)
         latency = (time.time() - start) * 1000
+        profiling.record("tashkeel", latency)
 
         return result, latency
     
@@ -147,20 +213,25 @@ class CoquiTTS:
             if not latents:
                 raise ValueError(f"Unsupported language: {language}")
 
-            with torch.inference_mode():
-                output = self.model.inference(
-                    text=text,
-                    language=language,
-                    gpt_cond_latent=latents["gpt"],
-                    speaker_embedding=latents["speaker"],
-                    temperature=0.7,
-                )
+            async with self.memory.reserve("xtts"):
+                with profiling.stage("xtts"):
+                    output = await self.tts_executor.run(
+                        profiling.traced(self.model.inference, "xtts"),
+                        text=text,
+                        language=language,
+                        gpt_cond_latent=latents["gpt"],
+                        speaker_embedding=latents["speaker"],
+                        temperature=0.7,
+                    )
 
             audio = output["wav"]
 
             buf = io.BytesIO()
-            sf.write(buf, audio, samplerate=24000, format='WAV')
-            audio_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
+            with profiling.stage("wav_write"):
+                sf.write(buf, audio, samplerate=24000, format='WAV')
+
+            with profiling.stage("base64"):
+                audio_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
 
             latency = (time.time() - start_time) * 1000
 
@@ -176,39 +247,67 @@ class CoquiTTS:
 
         @web_app.get("/ping")
         async def ping():
-            return {"status": "ok", "message": "TTS API is alive!"}
+            return {
+                "status": "ok",
+                "message": "TTS API is alive!",
+                "memory": self.memory.report(),
+            }
         
         @web_app.post("/synthesize")
         async def synthesize(req: SynthesizeRequest):
             if not req.text:
                 raise HTTPException(status_code=400, detail="text is required")
 
-            total_start = time.time()
-
-            text = req.text
-            tashkeel_latency = 0
-
-            # 🔥 Apply tashkeel only for Arabic
-            if req.language == "ar":
-                text, tashkeel_latency = await self.diacritize(text)
+            with self.profiler.request("tts"):
+                total_start = time.time()
+
+                text = req.text
+                tashkeel_latency = 0
+
+                # 🔥 Apply tashkeel only for Arabic
+                if req.language == "ar":
+                    text, tashkeel_latency = await self.diacritize(text)
+
+                try:
+                    audio, tts_latency = await self.text_to_speech(
+                        text,
+                        req.language,
+                    )
+
+                except Exception as e:
+                    print(f"Error in synthesis: {e}")
+                    raise HTTPException(status_code=500, detail=str(e))
+
+                total_latency = (time.time() - total_start) * 1000
+
+                return {
+                    "audio": audio,
+                    "tashkeel_latency": tashkeel_latency,
+                    "tts_latency": tts_latency,
+                    "total_latency": total_latency
+                }
+
+        def check_admin(token):
+            if not ADMIN_TOKEN or token != ADMIN_TOKEN:
+                raise HTTPException(status_code=403, detail="forbidden")
+
+        @web_app.post("/admin/profile")
+        async def start_profiling(req: ProfileRequest, x_admin_token: Optional[str] = Header(None)):
+            check_admin(x_admin_token)
+            self.profiler.arm(req.requests, req.torch_trace)
+            return self.profiler.status()
+
+        @web_app.get("/admin/profile")
+        async def profiling_status(x_admin_token: Optional[str] = Header(None)):
+            check_admin(x_admin_token)
+            return self.profiler.status()
+
+        @web_app.get("/admin/profile/{name}")
+        async def profiling_artifact(name: str, x_admin_token: Optional[str] = Header(None)):
+            check_admin(x_admin_token)
+            path = os.path.join(PROFILE_DIR, os.path.basename(name))
+            if not os.path.isfile(path):
+                raise HTTPException(status_code=404, detail="not found")
+            return FileResponse(path)
 
-            try:
-                audio, tts_latency = await self.text_to_speech(
-                    text,
-                    req.language,
-                )
-
-            except Exception as e:
-                print(f"Error in synthesis: {e}")
-                raise HTTPException(status_code=500, detail=str(e))
-
-            total_latency = (time.time() - total_start) * 1000
-
-            return {
-                "audio": audio,
-                "tashkeel_latency": tashkeel_latency,
-                "tts_latency": tts_latency,
-                "total_latency": total_latency
-            }
-        
         return web_app
\ No newline at end of file
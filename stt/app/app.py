@@ -3,8 +3,10 @@ import base64
 import numpy as np
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from faster_whisper import WhisperModel
-from runpod.serverless.utils import rp_cuda
+
+from model import ModelRegistry, MODEL_NAME
+from language import LanguageDetector, DETECT_MODEL
+from transcript import transcribe_options, segment_to_dict
 
 app = FastAPI()
 
@@ -14,25 +16,29 @@ app = FastAPI()
 class TranscriptionRequest(BaseModel):
     audio_base64: str
     language: str | None = None
+    model: str = MODEL_NAME
+    session_id: str | None = None
+    timestamps: bool = False
 
 class TranscriptionResponse(BaseModel):
     text: str
     language: str
+    model: str
+    language_detection: dict
+    segments: list[dict] | None = None
 
 # -----------------------------
 # Model Load (ONCE per worker)
 # -----------------------------
 print("Starting Whisper worker...")
 
-DEVICE = "cuda" if rp_cuda.is_available() else "cpu"
+registry = ModelRegistry()
 
-model = WhisperModel(
-    "medium",
-    device=DEVICE,
-    compute_type="float16" if DEVICE == "cuda" else "int8"
-)
+# Keep the default model warm so the first request doesn't pay for loading
+registry.get(MODEL_NAME)
+registry.get(DETECT_MODEL)
 
-print("Whisper medium model loaded on", DEVICE)
+language_detector = LanguageDetector(lambda: registry.get(DETECT_MODEL))
 
 # -----------------------------
 # Health Check
@@ -41,27 +47,51 @@ print("Whisper medium model loaded on", DEVICE)
 async def ping():
     return {"status": "healthy"}
 
+@app.get("/models")
+async def models():
+    return registry.stats()
+
 # -----------------------------
 # Transcription Endpoint
 # -----------------------------
+# Plain def: FastAPI runs it in the threadpool, so loading a model or
+# decoding never blocks the event loop (and /ping) for other requests
 @app.post("/transcribe", response_model=TranscriptionResponse)
-async def transcribe(req: TranscriptionRequest):
+def transcribe(req: TranscriptionRequest):
+    try:
+        model = registry.get(req.model)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         # Decode base64 → raw PCM16
         audio_bytes = base64.b64decode(req.audio_base64)
         audio = np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0
 
+        language, detection = language_detector.resolve(
+            audio,
+            req.language,
+            req.session_id
+        )
+
         segments, info = model.transcribe(
             audio,
-            beam_size=2,
-            language=req.language
+            language=language,
+            **transcribe_options(req.timestamps)
         )
 
+        segments = list(segments)
         text = "".join(segment.text for segment in segments)
 
+        if language is None:
+            language_detector.remember(req.session_id, info.language, info.language_probability)
+
         return {
             "text": text,
-            "language": info.language
+            "language": info.language,
+            "model": req.model,
+            "language_detection": detection,
+            "segments": [segment_to_dict(s) for s in segments] if req.timestamps else None
         }
 
     except Exception as e:
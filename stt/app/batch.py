@@ -0,0 +1,293 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, decode_audio
+
+from model import load_model, MODEL_NAME
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".m4a", ".opus", ".webm", ".mp4")
+SAMPLE_RATE = 16000
+# Whisper's window; anything shorter is a single chunk and gets batched
+# across files instead
+SHORT_CLIP_SECONDS = 30
+RESULTS_FILE = "results.jsonl"
+
+
+# -----------------------------
+# Input discovery
+# -----------------------------
+def source_root(source: str):
+    # Folder that input paths are relative to, used to lay out SRT files
+    return source if os.path.isdir(source) else os.path.dirname(os.path.abspath(source))
+
+
+def iter_audio_paths(source: str):
+    """
+    Yield audio paths lazily from a directory tree or a manifest file.
+
+    A manifest is either plain text (one path per line) or JSONL with a
+    "path" field. Relative paths are resolved against the manifest's folder.
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(AUDIO_EXTENSIONS):
+                    yield os.path.join(root, name)
+        return
+
+    base = source_root(source)
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            path = json.loads(line)["path"] if line.startswith("{") else line
+            yield os.path.join(base, path)
+
+
+def load_done(out_dir: str):
+    path = os.path.join(out_dir, RESULTS_FILE)
+    done = set()
+
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line from an interrupted run
+                    continue
+                # Failed files are retried
+                if "error" not in entry:
+                    done.add(entry["path"])
+
+    return done
+
+
+# -----------------------------
+# Decode (worker processes)
+# -----------------------------
+def decode(path: str):
+    # Decodes with PyAV and resamples to 16 kHz mono float32
+    return decode_audio(path, sampling_rate=SAMPLE_RATE)
+
+
+# -----------------------------
+# Output
+# -----------------------------
+def _srt_time(seconds: float):
+    ms = int(round(seconds * 1000))
+    h, ms = divmod(ms, 3_600_000)
+    m, ms = divmod(ms, 60_000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02}:{m:02}:{s:02},{ms:03}"
+
+
+def srt_path(out_dir: str, path: str, root: str):
+    # Mirror the input layout and keep the extension, so a/x.wav, b/x.wav and
+    # a/x.mp3 don't overwrite each other. Paths outside the root get a hash.
+    rel = os.path.relpath(os.path.abspath(path), os.path.abspath(root))
+    if rel.startswith(os.pardir):
+        digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:12]
+        rel = f"{digest}_{os.path.basename(path)}"
+    return os.path.join(out_dir, rel + ".srt")
+
+
+def write_srt(path: str, segments: list):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for i, seg in enumerate(segments, start=1):
+            f.write(f"{i}\n{_srt_time(seg['start'])} --> {_srt_time(seg['end'])}\n{seg['text'].strip()}\n\n")
+
+
+# -----------------------------
+# Transcription
+# -----------------------------
+def _segment(s, offset: float = 0.0):
+    return {"start": round(s.start - offset, 3), "end": round(s.end - offset, 3), "text": s.text}
+
+
+def transcribe_file(pipeline, audio, language, batch_size: int):
+    segments, info = pipeline.transcribe(
+        audio,
+        language=language,
+        beam_size=2,
+        batch_size=batch_size,
+    )
+    return info.language, [_segment(s) for s in segments]
+
+
+def transcribe_clips(pipeline, clips: list, language: str, batch_size: int):
+    """
+    Transcribe several short clips of one language in shared batches.
+
+    On its own a clip under 30 s is a single chunk, so it runs at batch size
+    1. Here the clips are laid end to end and each is passed as its own
+    chunk through `clip_timestamps`, so they fill the batch together.
+    Segments are mapped back to their clip by the chunk's seek frame.
+    """
+    fps = pipeline.model.frames_per_second
+    timestamps = []
+    by_seek = {}
+    position = 0
+    for i, audio in enumerate(clips):
+        timestamps.append({"start": position, "end": position + len(audio)})
+        by_seek[int(position / SAMPLE_RATE * fps)] = i
+        position += len(audio)
+
+    segments, _ = pipeline.transcribe(
+        np.concatenate(clips),
+        language=language,
+        beam_size=2,
+        batch_size=batch_size,
+        vad_filter=False,
+        clip_timestamps=timestamps,
+    )
+
+    per_clip = [[] for _ in clips]
+    for s in segments:
+        i = by_seek[s.seek]
+        per_clip[i].append(_segment(s, timestamps[i]["start"] / SAMPLE_RATE))
+    return per_clip
+
+
+# -----------------------------
+# Pipeline
+# -----------------------------
+def run(args):
+    os.makedirs(args.out, exist_ok=True)
+    done = load_done(args.out)
+
+    pipeline = BatchedInferencePipeline(model=load_model(args.model))
+    root = source_root(args.source)
+
+    files = 0
+    failed = 0
+    audio_seconds = 0.0
+    start = time.time()
+
+    pending = (p for p in iter_audio_paths(args.source) if p not in done)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool, \
+            open(os.path.join(args.out, RESULTS_FILE), "a", encoding="utf-8") as results:
+
+        def write(entry: dict):
+            results.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            results.flush()
+
+        def finish(path: str, language: str, duration: float, segments: list):
+            nonlocal files, audio_seconds
+
+            if args.srt:
+                write_srt(srt_path(args.out, path, root), segments)
+
+            write({
+                "path": path,
+                "language": language,
+                "duration_s": round(duration, 3),
+                "text": "".join(s["text"] for s in segments),
+                "segments": segments,
+            })
+
+            files += 1
+            audio_seconds += duration
+            wall = time.time() - start
+            print(f"[{files}] {path} ({duration:.1f}s) - {audio_seconds / wall:.1f} audio-s/wall-s")
+
+        def fail(path: str, error: Exception, stage: str):
+            # Recorded so the run carries on; load_done() retries these next time
+            nonlocal failed
+            failed += 1
+            print(f"⚠️ Failed to {stage} {path}: {error}")
+            write({"path": path, "error": f"{stage}: {error}"})
+
+        # Short clips waiting to share a batch, per language
+        short = {}
+
+        def flush(language: str):
+            group = short.pop(language, [])
+            if not group:
+                return
+            try:
+                per_clip = transcribe_clips(pipeline, [a for _, a in group], language, args.batch_size)
+            except Exception as e:
+                for path, _ in group:
+                    fail(path, e, "transcribe")
+                return
+            for (path, audio), segments in zip(group, per_clip):
+                finish(path, language, len(audio) / SAMPLE_RATE, segments)
+
+        # Only `prefetch` decoded files are ever held in memory at once, plus
+        # up to `batch_size` short clips per language waiting for a batch
+        window = deque()
+
+        def fill():
+            while len(window) < args.prefetch:
+                path = next(pending, None)
+                if path is None:
+                    return
+                window.append((path, pool.submit(decode, path)))
+
+        fill()
+        while window:
+            path, future = window.popleft()
+            fill()
+
+            try:
+                audio = future.result()
+            except Exception as e:
+                fail(path, e, "decode")
+                continue
+
+            duration = len(audio) / SAMPLE_RATE
+            if not len(audio):
+                finish(path, args.language, 0.0, [])
+                continue
+
+            try:
+                if duration < SHORT_CLIP_SECONDS:
+                    language = args.language or pipeline.model.detect_language(audio=audio)[0]
+                    short.setdefault(language, []).append((path, audio))
+                    if len(short[language]) >= args.batch_size:
+                        flush(language)
+                    continue
+
+                language, segments = transcribe_file(pipeline, audio, args.language, args.batch_size)
+            except Exception as e:
+                fail(path, e, "transcribe")
+                continue
+
+            finish(path, language, duration, segments)
+
+        for language in list(short):
+            flush(language)
+
+    wall = time.time() - start
+    print(f"✅ Transcribed {files} files, {audio_seconds:.1f}s of audio in {wall:.1f}s "
+          f"(RTF {wall / audio_seconds if audio_seconds else 0:.3f}); {len(done)} skipped from previous runs")
+    if failed:
+        print(f"⚠️ {failed} files failed and will be retried on the next run")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk offline Whisper transcription")
+    parser.add_argument("source", help="Directory of audio files or manifest (paths or JSONL with 'path')")
+    parser.add_argument("--out", default="output", help="Directory for results.jsonl and SRT files")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--language", default=None)
+    parser.add_argument("--srt", action="store_true", help="Also write one .srt per file, mirroring the input layout")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--prefetch", type=int, default=8, help="Max decoded files held in memory")
+    parser.add_argument("--batch-size", type=int, default=8, help="Segments (or short files) per inference batch")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
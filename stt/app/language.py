@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+SAMPLE_RATE = 16000
+
+# Small model used only for the detection pass, on the first few seconds
+DETECT_MODEL = os.getenv("WHISPER_DETECT_MODEL", "base")
+DETECT_SECONDS = float(os.getenv("LANGUAGE_DETECT_SECONDS", "4"))
+DETECT_THRESHOLD = float(os.getenv("LANGUAGE_DETECT_THRESHOLD", "0.7"))
+
+CACHE_SIZE = int(os.getenv("LANGUAGE_CACHE_SIZE", "10000"))
+CACHE_TTL = float(os.getenv("LANGUAGE_CACHE_TTL", "3600"))
+
+
+class LanguageDetector:
+    """
+    Resolves the language of a request before the full decode.
+
+    Order: explicit language, then the per-session cache, then a quick
+    detection pass on the first DETECT_SECONDS of audio. If that pass is not
+    confident enough, the language is left to the main model and whatever it
+    settles on is cached for the session. `get_model` returns the detection
+    model and is only called when a detection pass actually runs.
+    """
+
+    def __init__(self, get_model):
+        self.get_model = get_model
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._avg_detect_ms = 0.0
+
+    def _cached(self, session_id: str | None):
+        if session_id is None:
+            return None
+
+        with self._lock:
+            entry = self._cache.get(session_id)
+            if entry is None:
+                return None
+
+            language, expires = entry
+            if expires < time.time():
+                del self._cache[session_id]
+                return None
+
+            self._cache.move_to_end(session_id)
+            return language
+
+    def remember(self, session_id: str | None, language: str, probability: float):
+        if session_id is None or probability < DETECT_THRESHOLD:
+            return
+
+        with self._lock:
+            self._cache[session_id] = (language, time.time() + CACHE_TTL)
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def resolve(self, audio, language: str | None, session_id: str | None):
+        if language:
+            return language, {"source": "request", "detect_ms": 0.0, "saved_ms": 0.0}
+
+        cached = self._cached(session_id)
+        if cached:
+            return cached, {
+                "source": "cache",
+                "detect_ms": 0.0,
+                "saved_ms": round(self._avg_detect_ms, 2),
+            }
+
+        model = self.get_model()
+
+        start = time.time()
+        detected, probability, _ = model.detect_language(
+            audio[:int(DETECT_SECONDS * SAMPLE_RATE)]
+        )
+        detect_ms = (time.time() - start) * 1000
+
+        self._avg_detect_ms = detect_ms if not self._avg_detect_ms else 0.9 * self._avg_detect_ms + 0.1 * detect_ms
+
+        meta = {
+            "source": "fast",
+            "probability": round(probability, 3),
+            "detect_ms": round(detect_ms, 2),
+            "saved_ms": 0.0,
+        }
+
+        if probability < DETECT_THRESHOLD:
+            meta["source"] = "full"
+            return None, meta
+
+        self.remember(session_id, detected, probability)
+        return detected, meta
@@ -0,0 +1,147 @@
+import os
+import threading
+from collections import OrderedDict
+
+import ctranslate2
+from faster_whisper import WhisperModel
+from runpod.serverless.utils import rp_cuda
+
+DEVICE = "cuda" if rp_cuda.is_available() else "cpu"
+MODEL_NAME = os.getenv("WHISPER_DEFAULT_MODEL", "medium")
+
+# Approximate float16 weight footprint in MB, used for budget accounting
+MODEL_SIZES_MB = {
+    "tiny": 75,
+    "tiny.en": 75,
+    "base": 145,
+    "base.en": 145,
+    "small": 485,
+    "small.en": 485,
+    "medium": 1530,
+    "medium.en": 1530,
+    "large-v1": 3090,
+    "large-v2": 3090,
+    "large-v3": 3100,
+    "large-v3-turbo": 1620,
+    "distil-small.en": 335,
+    "distil-medium.en": 790,
+    "distil-large-v2": 1510,
+    "distil-large-v3": 1510,
+}
+
+# Preferred compute types per device, best first
+COMPUTE_TYPE_PREFERENCE = {
+    "cuda": ["float16", "int8_float16", "int8", "float32"],
+    "cpu": ["int8", "int8_float32", "float32"],
+}
+
+# Rough size relative to float16 weights
+COMPUTE_TYPE_SCALE = {
+    "float32": 2.0,
+    "float16": 1.0,
+    "int8_float16": 0.55,
+    "int8_float32": 0.55,
+    "int8": 0.55,
+}
+
+MEMORY_BUDGET_MB = int(os.getenv("WHISPER_MEMORY_BUDGET_MB", "6000"))
+
+
+def select_compute_type(device: str = DEVICE):
+    override = os.getenv("WHISPER_COMPUTE_TYPE")
+    if override:
+        return override
+
+    supported = ctranslate2.get_supported_compute_types(device)
+    for compute_type in COMPUTE_TYPE_PREFERENCE[device]:
+        if compute_type in supported:
+            return compute_type
+
+    return "default"
+
+
+def load_model(name: str = MODEL_NAME, compute_type: str | None = None):
+    model = WhisperModel(
+        name,
+        device=DEVICE,
+        compute_type=compute_type or select_compute_type()
+    )
+
+    print(f"Whisper {name} model loaded on", DEVICE)
+    return model
+
+
+class ModelRegistry:
+    """
+    Lazily loads Whisper models by name and keeps them resident under a
+    memory budget, evicting the least recently used model when a new one
+    does not fit.
+
+    Loading happens outside the registry lock, under a per-name lock, so a
+    slow download of one model never blocks requests for models already
+    resident. The budget covers the models the registry holds: an evicted
+    model stays in memory until the requests still using it finish, and a
+    model being loaded is only counted once it is ready, so actual usage
+    can briefly exceed it.
+    """
+
+    def __init__(self, budget_mb: int = MEMORY_BUDGET_MB):
+        self.budget_mb = budget_mb
+        self.compute_type = select_compute_type()
+
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    def footprint_mb(self, name: str):
+        return MODEL_SIZES_MB[name] * COMPUTE_TYPE_SCALE.get(self.compute_type, 1.0)
+
+    def resident_mb(self):
+        return sum(self.footprint_mb(name) for name in self._models)
+
+    def _resident(self, name: str):
+        with self._lock:
+            if name in self._models:
+                self._models.move_to_end(name)
+                return self._models[name]
+            return None
+
+    def get(self, name: str = MODEL_NAME):
+        if name not in MODEL_SIZES_MB:
+            raise KeyError(f"Unsupported model: {name}")
+
+        model = self._resident(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            loading = self._loading.setdefault(name, threading.Lock())
+
+        # Concurrent requests for the same model wait for one load
+        with loading:
+            model = self._resident(name)
+            if model is not None:
+                return model
+
+            # Make room first so the old weights can be freed before the
+            # new ones are allocated
+            with self._lock:
+                needed = self.footprint_mb(name)
+                while self._models and self.resident_mb() + needed > self.budget_mb:
+                    evicted, _ = self._models.popitem(last=False)
+                    print(f"Evicting Whisper {evicted} to fit {name}")
+
+            model = load_model(name, self.compute_type)
+
+            with self._lock:
+                self._models[name] = model
+            return model
+
+    def stats(self):
+        return {
+            "device": DEVICE,
+            "compute_type": self.compute_type,
+            "budget_mb": self.budget_mb,
+            "resident_mb": round(self.resident_mb()),
+            "models": list(self._models),
+        }
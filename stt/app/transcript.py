@@ -0,0 +1,42 @@
+import math
+
+# Decode keyword arguments shared by every caller. faster-whisper still builds
+# its TranscriptionOptions inside each transcribe() call and has no public way
+# to pass a prebuilt one, so these only keep the options in one place. Word
+# timestamps come from the same decode (cross-attention alignment), so asking
+# for them never triggers a second pass.
+TRANSCRIBE_OPTIONS = {
+    "beam_size": 2,
+}
+
+TIMESTAMP_OPTIONS = {
+    **TRANSCRIBE_OPTIONS,
+    "word_timestamps": True,
+}
+
+
+def transcribe_options(timestamps: bool):
+    return TIMESTAMP_OPTIONS if timestamps else TRANSCRIBE_OPTIONS
+
+
+def segment_to_dict(segment):
+    result = {
+        "start": round(segment.start, 3),
+        "end": round(segment.end, 3),
+        "text": segment.text,
+        "confidence": round(math.exp(segment.avg_logprob), 3),
+        "no_speech_prob": round(segment.no_speech_prob, 3),
+    }
+
+    if segment.words:
+        result["words"] = [
+            {
+                "start": round(word.start, 3),
+                "end": round(word.end, 3),
+                "word": word.word,
+                "probability": round(word.probability, 3),
+            }
+            for word in segment.words
+        ]
+
+    return result
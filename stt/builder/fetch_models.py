@@ -1,8 +1,10 @@
+import os
+
 from faster_whisper.utils import download_model
 
-model_names = [
-    "medium",
-]
+# Bake the models the worker is expected to serve into the image; anything
+# else is downloaded lazily on first request
+model_names = os.getenv("WHISPER_MODELS", "medium,base").split(",")
 
 
 def download_model_weights(selected_model):
@@ -16,6 +18,6 @@ def download_model_weights(selected_model):
 
 # Loop through models sequentially
 for model_name in model_names:
-    download_model_weights(model_name)
+    download_model_weights(model_name.strip())
 
-print("Finished downloading all models.")
\ No newline at end of file
+print("Finished downloading all models.")
@@ -1,4 +1,5 @@
 import modal
+import time
 from typing import Optional
 from pydantic import BaseModel
 
@@ -14,11 +15,21 @@ image = (
         "uvicorn",
         "faster-whisper",
     )
+    # Shared with the FastAPI worker in stt/app
+    .add_local_file("stt/app/language.py", "/root/language.py")
+    .add_local_file("stt/app/transcript.py", "/root/transcript.py")
 )
 
 class STTRequest(BaseModel):
     audio_base64: str
     language: Optional[str] = None
+    session_id: Optional[str] = None
+    timestamps: bool = False
+
+
+with image.imports():
+    from language import LanguageDetector, DETECT_MODEL
+    from transcript import transcribe_options, segment_to_dict
 
 
 @app.cls(
@@ -41,12 +52,19 @@ class WhisperModel:
             compute_type="float16",
         )
 
+        self.detect_model = WhisperModel(
+            DETECT_MODEL,
+            device="cuda",
+            compute_type="float16",
+        )
+
+        self.language_detector = LanguageDetector(lambda: self.detect_model)
+
     @modal.asgi_app(requires_proxy_auth=True)
     def web(self):
         from fastapi import FastAPI, HTTPException
         import base64
         import numpy as np
-        import time
 
         web_app = FastAPI()
 
@@ -54,11 +72,10 @@ class WhisperModel:
         async def ping():
             return {"status": "ok", "message": "Whisper API is alive!"}
 
+        # Plain def so decoding runs in the threadpool, not on the event loop
         @web_app.post("/transcribe")
-        async def transcribe(req: STTRequest):
+        def transcribe(req: STTRequest):
             try:
-                language = req.language or "en"
-
                 start = time.time()
 
                 audio_bytes = base64.b64decode(req.audio_base64)
@@ -68,19 +85,37 @@ class WhisperModel:
                     / 32768.0
                 )
 
-                segments, _ = self.model.transcribe(
+                language, detection = self.language_detector.resolve(
+                    audio, req.language, req.session_id
+                )
+
+                segments, info = self.model.transcribe(
                     audio,
-                    beam_size=2,
                     language=language,
                     condition_on_previous_text=False,
                     vad_filter=False,
+                    **transcribe_options(req.timestamps),
                 )
 
+                segments = list(segments)
                 text = "".join(seg.text for seg in segments)
 
+                if language is None:
+                    self.language_detector.remember(req.session_id, info.language, info.language_probability)
+
                 latency = (time.time() - start) * 1000
 
-                return {"text": text, "language": language, "latency_ms": round(latency, 2)}
+                response = {
+                    "text": text,
+                    "language": info.language,
+                    "language_detection": detection,
+                    "latency_ms": round(latency, 2),
+                }
+
+                if req.timestamps:
+                    response["segments"] = [segment_to_dict(s) for s in segments]
+
+                return response
 
             except Exception as e:
                 raise HTTPException(status_code=500, detail=str(e))
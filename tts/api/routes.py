@@ -1,16 +1,29 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+from typing import Literal
+import os
 import time
 
-from services.tts_service import synthesize
-from services.tashkeel_service import diacritize
+from config import DEFAULT_TENANT, PROFILE_DIR, ADMIN_TOKEN
+from utils.profiling import Profiler
+from services.tts_service import synthesize, gpu_scheduler, tts_flight
+from services.tashkeel_service import diacritize, tashkeel_scheduler, tashkeel_flight
 
 router = APIRouter()
+profiler = Profiler(PROFILE_DIR)
 
 class TTSRequest(BaseModel):
     text: str
     language: str = "en"
     speaker: str | None = None
+    priority: Literal["interactive", "bulk"] = "interactive"
+    tenant: str = DEFAULT_TENANT
+
+
+class ProfileRequest(BaseModel):
+    requests: int = Field(10, ge=1, le=1000)
+    torch_trace: bool = True
 
 
 @router.post("/tts")
@@ -18,35 +31,82 @@ async def tts_endpoint(req: TTSRequest):
     if not req.text:
         raise HTTPException(status_code=400, detail="text is required")
 
-    total_start = time.time()
+    with profiler.request("tts"):
+        total_start = time.time()
 
-    text = req.text
-    tashkeel_latency = 0
+        text = req.text
+        tashkeel_latency = 0
 
-    # 🔥 Apply tashkeel only for Arabic
-    if req.language == "ar":
-        text, tashkeel_latency = await diacritize(text)
+        # 🔥 Apply tashkeel only for Arabic
+        if req.language == "ar":
+            text, tashkeel_latency = await diacritize(text, req.tenant, req.priority)
 
-    try:
-        audio, speaker, tts_latency = await synthesize(
-            text,
-            req.language,
-            req.speaker
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        try:
+            audio, speaker, tts_latency = await synthesize(
+                text,
+                req.language,
+                req.speaker,
+                req.tenant,
+                req.priority
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
-    total_latency = (time.time() - total_start) * 1000
+        total_latency = (time.time() - total_start) * 1000
 
-    return {
-        "audio": audio,
-        "format": "wav",
-        "language": req.language,
-        "speaker": speaker,
-        "text": text,
-        "latency": {
-            "tashkeel_ms": round(tashkeel_latency, 2),
-            "tts_ms": round(tts_latency, 2),
-            "total_ms": round(total_latency, 2)
+        return {
+            "audio": audio,
+            "format": "wav",
+            "language": req.language,
+            "speaker": speaker,
+            "text": text,
+            "latency": {
+                "tashkeel_ms": round(tashkeel_latency, 2),
+                "tts_ms": round(tts_latency, 2),
+                "total_ms": round(total_latency, 2)
+            }
         }
+
+
+@router.get("/metrics/queue")
+async def queue_metrics():
+    return {
+        "tts": gpu_scheduler.metrics(),
+        "tashkeel": tashkeel_scheduler.metrics(),
+    }
+
+
+@router.get("/metrics/coalescing")
+async def coalescing_metrics():
+    return {
+        "tts": tts_flight.metrics(),
+        "tashkeel": tashkeel_flight.metrics(),
     }
+
+
+def _check_admin(token: str | None):
+    # Admin endpoints stay off unless a token is configured
+    if not ADMIN_TOKEN or token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="forbidden")
+
+
+@router.post("/admin/profile")
+async def start_profiling(req: ProfileRequest, x_admin_token: str | None = Header(None)):
+    _check_admin(x_admin_token)
+    profiler.arm(req.requests, req.torch_trace)
+    return profiler.status()
+
+
+@router.get("/admin/profile")
+async def profiling_status(x_admin_token: str | None = Header(None)):
+    _check_admin(x_admin_token)
+    return profiler.status()
+
+
+@router.get("/admin/profile/{name}")
+async def profiling_artifact(name: str, x_admin_token: str | None = Header(None)):
+    _check_admin(x_admin_token)
+    path = os.path.join(PROFILE_DIR, os.path.basename(name))
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="not found")
+    return FileResponse(path)
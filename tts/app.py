@@ -2,6 +2,7 @@ from fastapi import FastAPI
 import uvicorn
 
 from config import PORT
+from core.device import memory
 from api.routes import router
 from services.tts_service import load_tts
 from services.tashkeel_service import load_tashkeel
@@ -14,7 +15,7 @@ app.include_router(router)
 # Health endpoint required by RunPod
 @app.get("/ping")
 async def ping():
-    return {"status": "healthy"}
+    return {"status": "healthy", "memory": memory.report()}
 
 # Load model at startup
 load_tts()
@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import time
+from itertools import groupby
+
+from config import DEFAULT_SPEAKERS
+from services.tts_service import load_tts, render, save_wav, audio_seconds
+from services.tashkeel_service import load_tashkeel, diacritize
+
+CHECKPOINT_FILE = "checkpoint.jsonl"
+RESULTS_FILE = "results.jsonl"
+
+
+# -----------------------------
+# Manifest
+# -----------------------------
+def _normalize(row: dict, line_no: int):
+    # Accept both {"input": {...}} (RunPod style, see test_input.json) and flat rows
+    fields = row.get("input", row)
+    language = fields.get("language") or fields.get("lang") or "en"
+    speaker = fields.get("speaker") or DEFAULT_SPEAKERS.get(language, "Gracie Wise")
+
+    return {
+        "id": str(fields.get("id") or line_no),
+        "text": (fields.get("text") or "").strip(),
+        "language": language,
+        "speaker": speaker,
+    }
+
+
+def _read_json_rows(text: str, path: str):
+    rows = []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            rows.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            # Not line-delimited: accept one JSON object or array instead,
+            # e.g. test_input.json
+            try:
+                data = json.loads(text)
+            except json.JSONDecodeError:
+                raise ValueError(f"{path}:{line_no}: invalid JSON ({e.msg})") from None
+            return data if isinstance(data, list) else [data]
+
+    return rows
+
+
+def read_manifest(path: str):
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = _read_json_rows(f.read(), path)
+
+    return [_normalize(row, i) for i, row in enumerate(rows, start=1)]
+
+
+def job_key(item: dict):
+    raw = "\x1f".join((item["language"], item["speaker"], item["text"]))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+# -----------------------------
+# Checkpoint
+# -----------------------------
+def load_checkpoint(out_dir: str):
+    path = os.path.join(out_dir, CHECKPOINT_FILE)
+    done = {}
+
+    if not os.path.exists(path):
+        return done
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn last line from an interrupted run
+                continue
+            if os.path.exists(os.path.join(out_dir, entry["audio"])):
+                done[entry["key"]] = entry
+
+    return done
+
+
+# -----------------------------
+# Synthesis
+# -----------------------------
+async def synthesize_one(item: dict, key: str, out_dir: str, checkpoint):
+    text = item["text"]
+    if item["language"] == "ar":
+        text, _ = await diacritize(text, priority="bulk")
+
+    wav, _, _ = await render(text, item["language"], item["speaker"], priority="bulk")
+
+    audio = f"{key}.wav"
+    tmp_path = os.path.join(out_dir, audio + ".part")
+    save_wav(wav, tmp_path)
+    os.replace(tmp_path, os.path.join(out_dir, audio))
+
+    entry = {"key": key, "audio": audio, "duration_s": round(audio_seconds(wav), 3)}
+    checkpoint.write(json.dumps(entry) + "\n")
+    checkpoint.flush()
+
+    return entry
+
+
+async def run(manifest: str, out_dir: str, batch_size: int):
+    os.makedirs(out_dir, exist_ok=True)
+
+    items = [item for item in read_manifest(manifest) if item["text"]]
+    done = load_checkpoint(out_dir)
+
+    # Dedupe identical lines, then group by language and speaker
+    pending = {}
+    for item in items:
+        key = job_key(item)
+        if key not in done:
+            pending.setdefault(key, item)
+
+    by_voice = lambda kv: (kv[1]["language"], kv[1]["speaker"])
+    ordered = sorted(pending.items(), key=by_voice)
+
+    print(f"📄 {len(items)} lines, {len(pending) + len(done)} unique, {len(done)} already done")
+
+    start = time.time()
+    rendered_seconds = 0.0
+    failed = {}
+
+    with open(os.path.join(out_dir, CHECKPOINT_FILE), "a", encoding="utf-8") as checkpoint:
+        for (language, speaker), group in groupby(ordered, key=by_voice):
+            group = list(group)
+            print(f"🎙 {language} / {speaker}: {len(group)} lines")
+
+            for i in range(0, len(group), batch_size):
+                batch = group[i:i + batch_size]
+                entries = await asyncio.gather(*(
+                    synthesize_one(item, key, out_dir, checkpoint)
+                    for key, item in batch
+                ), return_exceptions=True)
+
+                # A bad line is reported and left out of the checkpoint, so
+                # it is retried on resume without stopping the rest
+                for (key, item), entry in zip(batch, entries):
+                    if isinstance(entry, Exception):
+                        failed[key] = str(entry)
+                        print(f"   ❌ {item['id']}: {entry}")
+                        continue
+                    done[entry["key"]] = entry
+                    rendered_seconds += entry["duration_s"]
+
+                wall = time.time() - start
+                print(f"   {min(i + batch_size, len(group))}/{len(group)} "
+                      f"({rendered_seconds / wall:.2f} audio-s/wall-s)")
+
+    wall = time.time() - start
+
+    with open(os.path.join(out_dir, RESULTS_FILE), "w", encoding="utf-8") as f:
+        for item in items:
+            key = job_key(item)
+            if key in done:
+                result = {"audio": done[key]["audio"], "duration_s": done[key]["duration_s"]}
+            else:
+                result = {"error": failed[key]}
+            f.write(json.dumps({**item, **result}, ensure_ascii=False) + "\n")
+
+    throughput = rendered_seconds / wall if wall > 0 else 0.0
+    print(f"✅ Rendered {rendered_seconds:.1f}s of audio in {wall:.1f}s "
+          f"({throughput:.2f} audio-s/wall-s)")
+    if failed:
+        print(f"⚠️ {len(failed)} lines failed, re-run to retry them")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline bulk XTTS synthesis")
+    parser.add_argument("manifest", help="JSONL or CSV file with text, language/lang, speaker, id")
+    parser.add_argument("--out", default="output/batch", help="Directory for audio and manifests")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    load_tts()
+    load_tashkeel()
+
+    asyncio.run(run(args.manifest, args.out, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
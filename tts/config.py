@@ -4,8 +4,38 @@ import os
 PORT = int(os.getenv("PORT", "80"))
 PORT_HEALTH = int(os.getenv("PORT_HEALTH", str(PORT)))
 
-# GPU concurrency
-MAX_GPU_CONCURRENCY = int(os.getenv("MAX_GPU_CONCURRENCY", "4"))
+# Adaptive GPU concurrency: starting point and bounds for the AIMD limiters
+GPU_CONCURRENCY_INITIAL = int(os.getenv("GPU_CONCURRENCY_INITIAL", "4"))
+GPU_CONCURRENCY_MAX = int(os.getenv("GPU_CONCURRENCY_MAX", "16"))
+TASHKEEL_CONCURRENCY_INITIAL = int(os.getenv("TASHKEEL_CONCURRENCY_INITIAL", "2"))
+TASHKEEL_CONCURRENCY_MAX = int(os.getenv("TASHKEEL_CONCURRENCY_MAX", "8"))
+
+# Back off when latency exceeds this multiple of the best seen for requests
+# of similar length,
+# or when uncommitted GPU memory drops below this fraction
+LATENCY_TOLERANCE = float(os.getenv("LATENCY_TOLERANCE", "2.0"))
+GPU_MIN_HEADROOM = float(os.getenv("GPU_MIN_HEADROOM", "0.1"))
+
+# Fair scheduling across tenants, e.g. TENANT_WEIGHTS="calls:4,narration:1"
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+TENANT_WEIGHTS = {
+    name: float(weight)
+    for name, weight in (
+        item.split(":") for item in os.getenv("TENANT_WEIGHTS", "").split(",") if item
+    )
+}
+
+# GPU memory budgeting. Activation budgets are floors; warm-up calibration
+# raises them to the measured peak. TASHKEEL_DEVICE is auto, cuda or cpu.
+GPU_MEMORY_SAFETY = float(os.getenv("GPU_MEMORY_SAFETY", "0.1"))
+XTTS_ACTIVATION_MB = float(os.getenv("XTTS_ACTIVATION_MB", "1024"))
+TASHKEEL_ACTIVATION_MB = float(os.getenv("TASHKEEL_ACTIVATION_MB", "128"))
+TASHKEEL_WEIGHTS_MB = float(os.getenv("TASHKEEL_WEIGHTS_MB", "450"))
+TASHKEEL_DEVICE = os.getenv("TASHKEEL_DEVICE", "auto")
+
+# On-demand profiling artifacts (see /admin/profile)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
 # XTTS paths
 XTTS_MODEL_DIR = os.getenv("XTTS_MODEL_DIR", "models/xtts_v2")
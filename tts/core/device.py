@@ -1,7 +1,18 @@
 import torch
 from runpod.serverless.utils import rp_cuda
 
+from config import GPU_MEMORY_SAFETY
+from core.memory import MemoryManager
+
 torch.backends.cuda.matmul.allow_tf32 = True
 torch.set_float32_matmul_precision("high")
 
 DEVICE = "cuda" if rp_cuda.is_available() else "cpu"
+
+# Shared by XTTS and the tashkeel model, which live on the same card
+memory = MemoryManager(DEVICE, GPU_MEMORY_SAFETY)
+
+
+def gpu_memory_headroom():
+    # Uncommitted fraction of device memory, None when running on CPU
+    return memory.headroom()
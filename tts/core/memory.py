@@ -0,0 +1,139 @@
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+
+import torch
+
+MB = 1024 * 1024
+
+
+class MemoryManager:
+    """
+    GPU memory accounting for models sharing one card.
+
+    Model weights are measured as they load and each model gets a
+    per-request activation budget, calibrated from a warm-up call when one
+    is provided. Requests reserve their budget before running and wait while
+    the card is fully committed, instead of racing each other into an OOM.
+    On CPU every reservation is a no-op.
+    """
+
+    def __init__(self, device: str, safety_fraction: float = 0.1):
+        self.device = device
+        self.enabled = device == "cuda"
+        self.safety_fraction = safety_fraction
+
+        self.footprints = {}
+        self.budgets = {}
+        self.placement = {}
+
+        self._reserved = 0.0
+        self._condition = None
+
+        self.total_mb = 0.0
+        self.baseline_mb = 0.0
+        if self.enabled:
+            free, total = torch.cuda.mem_get_info()
+            self.total_mb = total / MB
+            # CUDA context and anything else already on the card
+            self.baseline_mb = (total - free) / MB
+
+    @contextmanager
+    def measure(self, name: str, on_gpu: bool = True):
+        if not self.enabled or not on_gpu:
+            self.placement[name] = "cpu"
+            yield
+            return
+
+        torch.cuda.synchronize()
+        before = torch.cuda.memory_allocated()
+        yield
+        torch.cuda.synchronize()
+
+        self.footprints[name] = (torch.cuda.memory_allocated() - before) / MB
+        self.placement[name] = "cuda"
+
+    def calibrate(self, name: str, fn, default_mb: float):
+        """
+        Set the per-request budget for `name` from the peak memory of a
+        warm-up call, never going below `default_mb`.
+        """
+        self.budgets[name] = default_mb
+
+        if not self.enabled or self.placement.get(name) != "cuda":
+            fn()
+            return
+
+        torch.cuda.synchronize()
+        base = torch.cuda.memory_allocated()
+        torch.cuda.reset_peak_memory_stats()
+
+        fn()
+
+        torch.cuda.synchronize()
+        measured = (torch.cuda.max_memory_allocated() - base) / MB
+        self.budgets[name] = max(default_mb, measured * 1.25)
+
+    def capacity_mb(self):
+        usable = self.total_mb * (1 - self.safety_fraction)
+        return usable - self.baseline_mb - sum(self.footprints.values())
+
+    def available_mb(self):
+        return self.capacity_mb() - self._reserved
+
+    def headroom(self):
+        """
+        Fraction of the card not committed to weights or reservations, None
+        on CPU. Taken from the budgets rather than the allocator, whose
+        cached blocks are tied to the stream that freed them.
+        """
+        if not self.enabled:
+            return None
+        return max(0.0, self.available_mb()) / self.total_mb
+
+    def fits_on_gpu(self, needed_mb: float):
+        return self.enabled and self.available_mb() >= needed_mb
+
+    @asynccontextmanager
+    async def reserve(self, name: str):
+        mb = self.budgets.get(name, 0.0) if self.placement.get(name) == "cuda" else 0.0
+        if not mb:
+            yield
+            return
+
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+
+        async with self._condition:
+            # A lone request is always admitted, even if its budget is larger
+            # than the card, so nothing can wait forever
+            await self._condition.wait_for(
+                lambda: self._reserved == 0 or self.available_mb() >= mb
+            )
+            self._reserved += mb
+
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._reserved -= mb
+                self._condition.notify_all()
+
+    def report(self):
+        report = {
+            "device": self.device,
+            "placement": dict(self.placement),
+        }
+
+        if not self.enabled:
+            return report
+
+        free, _ = torch.cuda.mem_get_info()
+        report.update({
+            "total_mb": round(self.total_mb),
+            "free_mb": round(free / MB),
+            "models_mb": {k: round(v) for k, v in self.footprints.items()},
+            "budgets_mb": {k: round(v) for k, v in self.budgets.items()},
+            "reserved_mb": round(self._reserved),
+            "headroom_mb": round(self.available_mb()),
+        })
+        return report
@@ -1,40 +1,116 @@
-import asyncio
 import time
 from camel_tools.disambig.bert import BERTUnfactoredDisambiguator
 from camel_tools.tagger.default import DefaultTagger
 from camel_tools.tokenizers.word import simple_word_tokenize
+from core.device import DEVICE, gpu_memory_headroom, memory
+from core.executor import InferenceExecutor
+from config import (
+    DEFAULT_TENANT,
+    TENANT_WEIGHTS,
+    TASHKEEL_CONCURRENCY_INITIAL,
+    TASHKEEL_CONCURRENCY_MAX,
+    LATENCY_TOLERANCE,
+    GPU_MIN_HEADROOM,
+    TASHKEEL_ACTIVATION_MB,
+    TASHKEEL_WEIGHTS_MB,
+    TASHKEEL_DEVICE,
+    GPU_CONCURRENCY_INITIAL,
+)
+from utils.concurrency import AdaptiveLimiter
+from utils.scheduler import FairScheduler
+from utils.singleflight import SingleFlight
+from utils import profiling
 
-# Separate semaphore for tashkeel
-TASHKEEL_CONCURRENCY = 2
-tashkeel_semaphore = asyncio.Semaphore(TASHKEEL_CONCURRENCY)
+# Separate limiter and scheduler for tashkeel
+tashkeel_limiter = AdaptiveLimiter(
+    TASHKEEL_CONCURRENCY_INITIAL,
+    max_limit=TASHKEEL_CONCURRENCY_MAX,
+    tolerance=LATENCY_TOLERANCE,
+    min_headroom=GPU_MIN_HEADROOM,
+    headroom=gpu_memory_headroom,
+)
+tashkeel_scheduler = FairScheduler(tashkeel_limiter, TENANT_WEIGHTS)
+tashkeel_executor = InferenceExecutor(tashkeel_limiter.max_limit, name="tashkeel", device=DEVICE)
+tashkeel_flight = SingleFlight()
+
+TASHKEEL_WARMUP_TEXT = "مرحبا بك"
 
 disambiguator = None
 tagger = None
 
 
+def _tashkeel_on_gpu():
+    if TASHKEEL_DEVICE != "auto":
+        return TASHKEEL_DEVICE == "cuda"
+
+    # Keep BERT on the GPU only if XTTS still has room for its starting
+    # concurrency afterwards; otherwise it runs on CPU
+    needed = (
+        TASHKEEL_WEIGHTS_MB
+        + TASHKEEL_ACTIVATION_MB
+        + memory.budgets.get("xtts", 0.0) * GPU_CONCURRENCY_INITIAL
+    )
+    return memory.fits_on_gpu(needed)
+
+
 def load_tashkeel():
     global disambiguator, tagger
 
-    print("🔤 Loading CAMeL BERT diacritizer...")
-    disambiguator = BERTUnfactoredDisambiguator.pretrained(
-        model_name='msa',
-        use_gpu=True
-    )
+    use_gpu = _tashkeel_on_gpu()
+
+    print(f"🔤 Loading CAMeL BERT diacritizer on {'GPU' if use_gpu else 'CPU'}...")
+    # On CPU, GPU memory pressure says nothing about tashkeel throughput
+    if not use_gpu:
+        tashkeel_limiter.headroom = None
+
+    with memory.measure("tashkeel", on_gpu=use_gpu):
+        disambiguator = BERTUnfactoredDisambiguator.pretrained(
+            model_name='msa',
+            use_gpu=use_gpu
+        )
     tagger = DefaultTagger(disambiguator, 'diac')
+
+    memory.calibrate(
+        "tashkeel",
+        lambda: tagger.tag(simple_word_tokenize(TASHKEEL_WARMUP_TEXT)),
+        TASHKEEL_ACTIVATION_MB
+    )
     print("✅ Tashkeel model loaded.")
 
 
-async def diacritize(text: str):
-    async with tashkeel_semaphore:
+async def diacritize(
+    text: str,
+    tenant: str = DEFAULT_TENANT,
+    priority: str = "interactive",
+):
+    result, shared = await tashkeel_flight.do(
+        (text, priority),
+        lambda: _diacritize(text, tenant, priority)
+    )
+
+    if shared:
+        tashkeel_flight.record_saved(result[1])
+
+    return result
+
+
+async def _diacritize(text, tenant, priority):
+    with profiling.stage("tokenize"):
         tokens = simple_word_tokenize(text)
 
-        start = time.time()
-        diacritized_tokens = await asyncio.to_thread(
-            tagger.tag,
-            tokens
-        )
+    queued = time.time()
+    async with tashkeel_scheduler.slot(tenant, priority, cost=len(tokens)):
+        async with memory.reserve("tashkeel"):
+            start = time.time()
+            profiling.record("tashkeel_queue", (start - queued) * 1000)
+
+            diacritized_tokens = await tashkeel_executor.run(
+                profiling.traced(tagger.tag, "tashkeel"),
+                tokens
+            )
 
         result = " ".join(diacritized_tokens)
         latency = (time.time() - start) * 1000
+        profiling.record("tashkeel", latency)
 
     return result, latency
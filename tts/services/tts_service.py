@@ -1,12 +1,38 @@
-import asyncio
-import tempfile
+import io
 import base64
 import time
 from TTS.api import TTS
-from core.device import DEVICE
-from config import MAX_GPU_CONCURRENCY, DEFAULT_SPEAKERS
+from core.device import DEVICE, gpu_memory_headroom, memory
+from core.executor import InferenceExecutor
+from config import (
+    DEFAULT_SPEAKERS,
+    DEFAULT_TENANT,
+    TENANT_WEIGHTS,
+    GPU_CONCURRENCY_INITIAL,
+    GPU_CONCURRENCY_MAX,
+    LATENCY_TOLERANCE,
+    GPU_MIN_HEADROOM,
+    XTTS_ACTIVATION_MB,
+)
+from utils.concurrency import AdaptiveLimiter
+from utils.scheduler import FairScheduler
+from utils.singleflight import SingleFlight
+from utils import profiling
 
-gpu_semaphore = asyncio.Semaphore(MAX_GPU_CONCURRENCY)
+gpu_limiter = AdaptiveLimiter(
+    GPU_CONCURRENCY_INITIAL,
+    max_limit=GPU_CONCURRENCY_MAX,
+    tolerance=LATENCY_TOLERANCE,
+    min_headroom=GPU_MIN_HEADROOM,
+    headroom=gpu_memory_headroom,
+)
+gpu_scheduler = FairScheduler(gpu_limiter, TENANT_WEIGHTS)
+# One inference thread per admissible request, so everything the limiter
+# lets through is actually running rather than queued behind the executor
+tts_executor = InferenceExecutor(gpu_limiter.max_limit, name="xtts", device=DEVICE)
+tts_flight = SingleFlight()
+
+TTS_WARMUP_TEXT = "This is a warm-up sentence to load the TTS model."
 
 tts_model = None
 
@@ -14,35 +40,103 @@ tts_model = None
 def load_tts():
     global tts_model
     print("🎙 Loading XTTS v2...")
-    tts_model = TTS(
-        model_path="models/xtts_v2",
-        config_path="models/xtts_v2/config.json",
-        progress_bar=False
-    ).to(DEVICE)
+    with memory.measure("xtts"):
+        tts_model = TTS(
+            model_path="models/xtts_v2",
+            config_path="models/xtts_v2/config.json",
+            progress_bar=False
+        ).to(DEVICE)
+
+    # XTTS runs GPT decode then the HiFi-GAN vocoder; timing the vocoder
+    # separates the two on profiled requests
+    profiling.time_module(tts_model.synthesizer.tts_model.hifigan_decoder, "vocoder")
+
+    # Warm-up doubles as calibration of the per-request activation budget
+    memory.calibrate("xtts", lambda: tts_model.tts(
+        text=TTS_WARMUP_TEXT,
+        speaker=DEFAULT_SPEAKERS["en"],
+        language="en",
+        split_sentences=False
+    ), XTTS_ACTIVATION_MB)
     print("✅ XTTS ready.")
 
 
-async def synthesize(text: str, language: str, speaker: str | None):
+async def render(
+    text: str,
+    language: str,
+    speaker: str | None,
+    tenant: str = DEFAULT_TENANT,
+    priority: str = "interactive",
+):
+    if speaker is None:
+        speaker = DEFAULT_SPEAKERS.get(language, "Gracie Wise")
+
+    wav = []
+    latency = 0
+
+    # One GPU slot per sentence, so interactive work can jump ahead of
+    # long bulk requests at every sentence boundary
+    for sentence in tts_model.synthesizer.split_into_sentences(text):
+        queued = time.time()
+        async with gpu_scheduler.slot(tenant, priority, cost=len(sentence)):
+            async with memory.reserve("xtts"):
+                profiling.record("gpu_queue", (time.time() - queued) * 1000)
+                start = time.time()
+
+                wav += await tts_executor.run(
+                    profiling.traced(tts_model.tts, "xtts"),
+                    text=sentence,
+                    speaker=speaker,
+                    language=language,
+                    split_sentences=False
+                )
+
+            sentence_ms = (time.time() - start) * 1000
+            profiling.record("xtts", sentence_ms)
+            latency += sentence_ms
+
+    return wav, speaker, latency
+
+
+def save_wav(wav, path):
+    tts_model.synthesizer.save_wav(wav=wav, path=path)
+
+
+def audio_seconds(wav):
+    return len(wav) / tts_model.synthesizer.output_sample_rate
+
+
+async def synthesize(
+    text: str,
+    language: str,
+    speaker: str | None,
+    tenant: str = DEFAULT_TENANT,
+    priority: str = "interactive",
+):
     if speaker is None:
         speaker = DEFAULT_SPEAKERS.get(language, "Gracie Wise")
 
-    async with gpu_semaphore:
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-            out_path = f.name
+    # Identical concurrent requests share one synthesis. Priority is part of
+    # the key so interactive callers never wait on a bulk-priority run.
+    result, shared = await tts_flight.do(
+        (text, language, speaker, priority),
+        lambda: _synthesize(text, language, speaker, tenant, priority)
+    )
+
+    if shared:
+        tts_flight.record_saved(result[2])
+
+    return result
 
-        start = time.time()
 
-        await asyncio.to_thread(
-            tts_model.tts_to_file,
-            text=text,
-            file_path=out_path,
-            speaker=speaker,
-            language=language
-        )
+async def _synthesize(text, language, speaker, tenant, priority):
+    wav, speaker, latency = await render(text, language, speaker, tenant, priority)
 
-        latency = (time.time() - start) * 1000
+    buf = io.BytesIO()
+    with profiling.stage("wav_write"):
+        save_wav(wav, buf)
 
-        with open(out_path, "rb") as f:
-            audio_bytes = f.read()
+    with profiling.stage("base64"):
+        audio = base64.b64encode(buf.getvalue()).decode("utf-8")
 
-    return base64.b64encode(audio_bytes).decode("utf-8"), speaker, latency
+    return audio, speaker, latency
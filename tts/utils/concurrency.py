@@ -1,4 +1,93 @@
-import asyncio
-from config import MAX_GPU_CONCURRENCY
+import math
+import time
+from collections import deque
 
-gpu_semaphore = asyncio.Semaphore(MAX_GPU_CONCURRENCY)
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit driven by observed latency and memory headroom.
+
+    Requests carry a large fixed cost on top of their per-unit cost, so a
+    short sentence is never as fast per character as a long one. Latency is
+    therefore compared against the best value over the last `window`
+    samples of similar cost (half-octave buckets), which keeps the ratio
+    within a bucket under sqrt(2) however large the fixed part is. While it
+    stays within `tolerance` of that baseline and there is memory headroom,
+    the limit grows by one per window of completions at full occupancy.
+    When latency inflates or headroom drops below `min_headroom`, it is cut
+    by `backoff`, at most once per observed request latency so the previous
+    cut has time to show before the next one.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        tolerance: float = 2.0,
+        backoff: float = 0.75,
+        min_headroom: float = 0.1,
+        headroom=None,
+        window: int = 200,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.min_headroom = min_headroom
+        self.headroom = headroom
+        self.window = window
+
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._samples = {}
+        self._baseline = None
+        self._last = None
+        self._last_headroom = None
+        self._window_completions = 0
+        self._last_decrease = 0.0
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    def observe(self, latency_ms: float, cost: float, in_flight: int):
+        self._last = latency_ms
+
+        # Baseline is the best latency among recent requests of similar cost,
+        # so one unusually fast sample ages out instead of pinning the limit
+        bucket = int(2 * math.log2(max(cost, 1.0)))
+        samples = self._samples.get(bucket)
+        if samples is None:
+            samples = self._samples[bucket] = deque(maxlen=self.window)
+        samples.append(latency_ms)
+        self._baseline = min(samples)
+
+        headroom = self.headroom() if self.headroom else None
+        self._last_headroom = headroom
+
+        congested = latency_ms > self._baseline * self.tolerance
+        out_of_memory = headroom is not None and headroom < self.min_headroom
+
+        if congested or out_of_memory:
+            now = time.monotonic()
+            if now - self._last_decrease > latency_ms / 1000:
+                self._limit = max(self.min_limit, self._limit * self.backoff)
+                self._last_decrease = now
+                self._window_completions = 0
+            return
+
+        if in_flight >= self.limit:
+            self._window_completions += 1
+            if self._window_completions >= self.limit:
+                self._limit = min(self.max_limit, self._limit + 1)
+                self._window_completions = 0
+
+    def metrics(self):
+        return {
+            "limit": self.limit,
+            "min": self.min_limit,
+            "max": self.max_limit,
+            "baseline_ms": round(self._baseline, 3) if self._baseline else None,
+            "last_ms": round(self._last, 3) if self._last else None,
+            "memory_headroom": round(self._last_headroom, 3) if self._last_headroom is not None else None,
+        }
@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+import torch
+
+_current = ContextVar("profile", default=None)
+
+# Only one torch profiler can be active per process
+_trace_lock = threading.Lock()
+
+
+class RequestProfile:
+    def __init__(self, output_dir: str, kind: str, torch_trace: bool):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{kind}-{uuid.uuid4().hex[:8]}"
+        self.output_dir = output_dir
+        self.torch_trace = torch_trace
+        self.stages = {}
+        self.traces = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, ms: float):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def trace_path(self, label: str):
+        with self._lock:
+            path = os.path.join(self.output_dir, f"{self.id}-{label}-{len(self.traces)}.trace.json")
+            self.traces.append(os.path.basename(path))
+        return path
+
+    def write(self, total_ms: float):
+        path = os.path.join(self.output_dir, f"{self.id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "id": self.id,
+                "total_ms": round(total_ms, 2),
+                "stages_ms": {k: round(v, 2) for k, v in self.stages.items()},
+                "torch_traces": self.traces,
+            }, f, indent=2)
+        return path
+
+
+class Profiler:
+    """
+    Sampled request profiling, armed on demand for the next N requests.
+
+    While disarmed, `request()` and the module-level helpers return no-op
+    contexts without allocating anything, so the hot path pays only a
+    counter check and a context variable lookup.
+    """
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self._remaining = 0
+        self._torch_trace = False
+        self._lock = threading.Lock()
+        self._recent = []
+
+    def arm(self, requests: int, torch_trace: bool = True):
+        os.makedirs(self.output_dir, exist_ok=True)
+        with self._lock:
+            self._remaining = requests
+            self._torch_trace = torch_trace
+
+    def _take(self):
+        if not self._remaining:
+            return False
+        with self._lock:
+            if not self._remaining:
+                return False
+            self._remaining -= 1
+            return True
+
+    @contextmanager
+    def request(self, kind: str):
+        if not self._take():
+            yield None
+            return
+
+        profile = RequestProfile(self.output_dir, kind, self._torch_trace)
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            yield profile
+        finally:
+            _current.reset(token)
+            path = profile.write((time.perf_counter() - start) * 1000)
+            with self._lock:
+                self._recent = (self._recent + [os.path.basename(path)])[-50:]
+
+    def status(self):
+        return {
+            "remaining": self._remaining,
+            "torch_trace": self._torch_trace,
+            "output_dir": self.output_dir,
+            "recent": list(self._recent),
+        }
+
+
+def record(name: str, ms: float):
+    profile = _current.get()
+    if profile is not None:
+        profile.add(name, ms)
+
+
+def stage(name: str):
+    profile = _current.get()
+    return profile.stage(name) if profile is not None else nullcontext()
+
+
+def traced(fn, label: str):
+    """
+    Wrap `fn` to run under the torch profiler when the current request is
+    being traced. Returns `fn` itself otherwise. If another call is already
+    being traced, this one runs untraced rather than waiting.
+    """
+    profile = _current.get()
+    if profile is None or not profile.torch_trace:
+        return fn
+
+    activities = [torch.profiler.ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(torch.profiler.ProfilerActivity.CUDA)
+
+    def run(*args, **kwargs):
+        if not _trace_lock.acquire(blocking=False):
+            return fn(*args, **kwargs)
+
+        try:
+            with torch.profiler.profile(activities=activities) as prof:
+                result = fn(*args, **kwargs)
+            prof.export_chrome_trace(profile.trace_path(label))
+        finally:
+            _trace_lock.release()
+
+        return result
+
+    return run
+
+
+def time_module(module: torch.nn.Module, name: str):
+    """
+    Attribute the forward time of `module` to stage `name` on profiled
+    requests. CUDA is synchronized only while a request is being profiled.
+    """
+    starts = {}
+
+    def pre_hook(mod, args):
+        if _current.get() is None:
+            return
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+        starts[threading.get_ident()] = time.perf_counter()
+
+    def post_hook(mod, args, output):
+        profile = _current.get()
+        start = starts.pop(threading.get_ident(), None)
+        if profile is None or start is None:
+            return
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+        profile.add(name, (time.perf_counter() - start) * 1000)
+
+    module.register_forward_pre_hook(pre_hook)
+    module.register_forward_hook(post_hook)
@@ -0,0 +1,171 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from utils.concurrency import AdaptiveLimiter
+
+# Served strictly in this order: bulk only runs when no interactive work waits
+PRIORITY_CLASSES = ("interactive", "bulk")
+
+
+def _new_tenant_stats():
+    return {
+        "queued": 0,
+        "in_flight": 0,
+        "completed": 0,
+        "wait_ms_total": 0.0,
+        "wait_ms_max": 0.0,
+        "last_active": time.monotonic(),
+    }
+
+
+class FairScheduler:
+    """
+    Hands out up to `limiter.limit` slots at a time.
+
+    Waiters are ordered by priority class first and then by start-time fair
+    queueing across tenants, so a tenant flooding the queue only gets its
+    weighted share instead of starving everyone behind it. Tenants idle for
+    longer than `idle_ttl` seconds are dropped from the stats.
+    """
+
+    def __init__(
+        self,
+        limiter: AdaptiveLimiter,
+        tenant_weights: dict | None = None,
+        idle_ttl: float = 300.0,
+    ):
+        self.limiter = limiter
+        self.tenant_weights = tenant_weights or {}
+        self.idle_ttl = idle_ttl
+
+        self._in_flight = 0
+        self._queue = []
+        self._seq = itertools.count()
+        self._virtual_time = {p: 0.0 for p in PRIORITY_CLASSES}
+        self._last_finish = {}
+        self._stats = defaultdict(_new_tenant_stats)
+        self._last_prune = time.monotonic()
+
+    @asynccontextmanager
+    async def slot(self, tenant: str, priority: str = "interactive", cost: float = 1.0):
+        await self._acquire(tenant, priority, cost)
+        in_flight = self._in_flight
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException:
+            # Failed or cancelled requests say nothing about GPU latency
+            self._release(tenant)
+            raise
+        self.limiter.observe((time.monotonic() - start) * 1000, cost, in_flight)
+        self._release(tenant)
+
+    async def _acquire(self, tenant: str, priority: str, cost: float):
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        weight = self.tenant_weights.get(tenant, 1.0)
+        key = (priority, tenant)
+
+        start_tag = max(self._virtual_time[priority], self._last_finish.get(key, 0.0))
+        self._last_finish[key] = start_tag + max(cost, 1.0) / weight
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (
+            PRIORITY_CLASSES.index(priority),
+            start_tag,
+            next(self._seq),
+            tenant,
+            time.monotonic(),
+            waiter,
+        ))
+        self._stats[tenant]["queued"] += 1
+        self._dispatch()
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.cancelled():
+                self._stats[tenant]["queued"] -= 1
+            else:
+                # Slot was granted just as we got cancelled, hand it on
+                self._release(tenant)
+            raise
+
+    def _release(self, tenant: str):
+        self._in_flight -= 1
+        stats = self._stats[tenant]
+        stats["in_flight"] -= 1
+        stats["completed"] += 1
+        stats["last_active"] = time.monotonic()
+        self._dispatch()
+        self._prune()
+
+    def _dispatch(self):
+        while self._in_flight < self.limiter.limit and self._queue:
+            rank, start_tag, _, tenant, enqueued, waiter = heapq.heappop(self._queue)
+            if waiter.done():
+                continue
+
+            priority = PRIORITY_CLASSES[rank]
+            self._virtual_time[priority] = max(self._virtual_time[priority], start_tag)
+            self._in_flight += 1
+
+            wait_ms = (time.monotonic() - enqueued) * 1000
+            stats = self._stats[tenant]
+            stats["queued"] -= 1
+            stats["in_flight"] += 1
+            stats["wait_ms_total"] += wait_ms
+            stats["wait_ms_max"] = max(stats["wait_ms_max"], wait_ms)
+            stats["last_active"] = time.monotonic()
+
+            waiter.set_result(None)
+
+    def _prune(self):
+        # Tenant names come from clients, so state for tenants that have gone
+        # quiet is dropped rather than kept forever. Checked at most once a
+        # second to keep the scan off the hot path.
+        now = time.monotonic()
+        if now - self._last_prune < 1.0:
+            return
+        self._last_prune = now
+
+        # With nothing waiting in a class nobody is owed a share, so virtual
+        # time catches up to the latest finish tag, as it would after idling
+        waiting = {entry[0] for entry in self._queue if not entry[-1].done()}
+        for (priority, _), finish in self._last_finish.items():
+            if PRIORITY_CLASSES.index(priority) not in waiting:
+                self._virtual_time[priority] = max(self._virtual_time[priority], finish)
+
+        # A finish tag behind virtual time has no effect on the next start tag
+        for key, finish in list(self._last_finish.items()):
+            if finish <= self._virtual_time[key[0]]:
+                del self._last_finish[key]
+
+        for tenant, stats in list(self._stats.items()):
+            idle = not stats["queued"] and not stats["in_flight"]
+            if idle and now - stats["last_active"] > self.idle_ttl:
+                del self._stats[tenant]
+
+    def metrics(self):
+        tenants = {}
+        for tenant, stats in self._stats.items():
+            started = stats["in_flight"] + stats["completed"]
+            tenants[tenant] = {
+                "queued": stats["queued"],
+                "in_flight": stats["in_flight"],
+                "completed": stats["completed"],
+                "avg_wait_ms": round(stats["wait_ms_total"] / started, 2) if started else 0.0,
+                "max_wait_ms": round(stats["wait_ms_max"], 2),
+            }
+
+        return {
+            "limiter": self.limiter.metrics(),
+            "in_flight": self._in_flight,
+            "queued": sum(s["queued"] for s in self._stats.values()),
+            "tenants": tenants,
+        }
@@ -0,0 +1,57 @@
+import asyncio
+
+
+def _consume_exception(task):
+    # If every caller disconnected, nobody awaits the shielded task, so read
+    # its exception here to keep asyncio from logging it as never retrieved
+    if not task.cancelled():
+        task.exception()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key starts the work and later callers await the
+    same task until it finishes. The task is shielded, so a caller that
+    disconnects does not cancel the work for everyone else sharing it.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.executions = 0
+        self.saved_ms = 0.0
+
+    async def do(self, key, fn):
+        """
+        Run `fn()` for `key`, or join the run already in flight.
+
+        Returns `(result, shared)` where `shared` is True when the result
+        came from another caller's execution.
+        """
+        self.calls += 1
+
+        task = self._inflight.get(key)
+        if task is not None:
+            return await asyncio.shield(task), True
+
+        self.executions += 1
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        task.add_done_callback(_consume_exception)
+
+        return await asyncio.shield(task), False
+
+    def record_saved(self, ms: float):
+        self.saved_ms += ms
+
+    def metrics(self):
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.calls - self.executions,
+            "in_flight": len(self._inflight),
+            "saved_ms": round(self.saved_ms, 2),
+        }